@@ -0,0 +1,72 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", 32))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", 64))
+CHAT_MAX_QUEUE_WAIT = float(os.getenv("CHAT_MAX_QUEUE_WAIT", 2.0))
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+class AdmissionController:
+    """Bounded in-flight work with a bounded, time-limited wait queue.
+
+    Requests beyond max_in_flight wait for a slot; they are shed when the
+    queue is full or when they wait longer than max_queue_wait (or their own
+    remaining deadline, if shorter). The queue cap is checked against the
+    in_flight and queued counters, which only change between awaits, so a
+    burst cannot slip past it before the semaphore notices.
+    """
+    
+    def __init__(self, max_in_flight: int = CHAT_MAX_IN_FLIGHT, max_queue: int = CHAT_MAX_QUEUE,
+                 max_queue_wait: float = CHAT_MAX_QUEUE_WAIT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+    
+    @asynccontextmanager
+    async def admit(self, budget: Optional[float] = None):
+        """Hold an in-flight slot for the duration of the block, or raise Overloaded."""
+        if self.in_flight + self.queued >= self.max_in_flight + self.max_queue:
+            self.shed += 1
+            raise Overloaded("Too many queued requests")
+        
+        wait = self.max_queue_wait if budget is None else min(self.max_queue_wait, budget)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), max(wait, 0))
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise Overloaded(f"No capacity within {wait:.2f}s")
+        finally:
+            self.queued -= 1
+        
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+    
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "limits": {
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "max_queue_wait": self.max_queue_wait
+            }
+        }
+
+chat_admission = AdmissionController()
@@ -1,7 +1,9 @@
-from langgraph.graph import StateGraph
+from typing import Dict, Optional
+from langgraph.graph import StateGraph, END
 from .state import ConversationState
 from .nodes import router, chat_node
 from .onboarding import onboarding_node
+from .memory import memory
 
 def get_agent_graph():
     """Create the MORVO agent graph."""
@@ -13,11 +15,35 @@ def get_agent_graph():
     graph.add_node("onboarding", onboarding_node)
     graph.add_node("chat", chat_node)
     
-    # Add edges
+    # Add edges: one turn is router -> (onboarding | chat) -> end
     graph.set_entry_point("router")
-    graph.add_edge("router", "onboarding")
-    graph.add_edge("router", "chat")
-    graph.add_edge("onboarding", "router")
-    graph.add_edge("chat", "router")
+    graph.add_conditional_edges("router", lambda state: state["next"], {"onboarding": "onboarding", "chat": "chat"})
+    graph.add_edge("onboarding", END)
+    graph.add_edge("chat", END)
     
-    return graph.compile()
\ No newline at end of file
+    return graph.compile()
+
+_agent_graph = None
+
+async def run_turn(user_id: str, message: str, deadline: Optional[float] = None) -> Dict:
+    """Run one user message through the agent graph, starting from the stored profile.
+    
+    `deadline` (a time.monotonic() value) is carried in the state so every
+    node and upstream call can size its timeout from the remaining budget.
+    """
+    global _agent_graph
+    if _agent_graph is None:
+        _agent_graph = get_agent_graph()
+    
+    profile = memory.get_user_profile(user_id) or {}
+    state = {
+        "user_id": user_id,
+        "input": message,
+        "name": profile.get("name", ""),
+        "role": profile.get("role", ""),
+        "goal": profile.get("goal", ""),
+        "language": profile.get("language", "en")
+    }
+    if deadline is not None:
+        state["deadline"] = deadline
+    return await _agent_graph.ainvoke(state)
\ No newline at end of file
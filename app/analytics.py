@@ -0,0 +1,379 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+
+from app.responses import cached_json
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+SENTIMENT_LABELS = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+# Columns cached per table: a timestamp, dictionary-encoded categories and float metrics
+TABLE_COLUMNS = {
+    "mentions": {"time": "created_at", "categories": ("brand", "source"), "numbers": ("sentiment",)},
+    "seo_signals": {"time": "created_at", "categories": ("keyword",), "numbers": ("rank",)},
+    "posts": {"time": "created_at", "categories": ("platform",), "numbers": ("likes", "comments", "shares")},
+}
+
+
+def parse_timestamp(value: Any) -> Optional[int]:
+    """Convert an ISO timestamp to epoch seconds (UTC)."""
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def parse_number(value: Any) -> float:
+    if isinstance(value, str) and value.lower() in SENTIMENT_LABELS:
+        return SENTIMENT_LABELS[value.lower()]
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def iso(ts: int) -> str:
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc).isoformat()
+
+
+def row_key(row: Dict[str, Any], time_column: str) -> Optional[Tuple[str, str]]:
+    """Keyset position of a row: its timestamp and id."""
+    if row.get(time_column) is None or row.get("id") is None:
+        return None
+    return str(row[time_column]), str(row["id"])
+
+
+def fetch_after(supabase, table: str, time_column: str, after: Optional[Tuple[str, str]],
+                since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """One page of rows ordered by (time_column, id), strictly after the `after` key
+    and, when given, no older than `since`.
+
+    Keyset paging keeps moving when more than a page of rows share a timestamp,
+    as every row of one bulk insert does.
+    """
+    # A single order param: older postgrest-py repeats the key instead of merging columns
+    query = supabase.table(table).select("*").order(f"{time_column}.asc,id")
+    if since:
+        query = query.gte(time_column, since)
+    if after:
+        ts, row_id = after
+        query = query.or_(f'{time_column}.gt."{ts}",and({time_column}.eq."{ts}",id.gt."{row_id}")')
+    return query.limit(PAGE_SIZE).execute().data
+
+
+class ColumnarTable:
+    """Append-only columnar cache of one table backed by growable NumPy arrays.
+
+    Strings are dictionary-encoded to int32 codes so group-bys reduce to
+    np.bincount. Rows are written past the visible length before it is
+    bumped, so readers slicing [:n] never see a partial row.
+    """
+
+    def __init__(self, name: str, time_column: str, categories: Sequence[str], numbers: Sequence[str]):
+        self.name = name
+        self.time_column = time_column
+        self.categories = tuple(categories)
+        self.numbers = tuple(numbers)
+        self.vocab: Dict[str, Dict[str, int]] = {c: {} for c in self.categories}
+        self.labels: Dict[str, List[str]] = {c: [] for c in self.categories}
+        self._arrays: Dict[str, np.ndarray] = {"ts": np.empty(0, dtype=np.int64)}
+        for column in self.categories:
+            self._arrays[column] = np.empty(0, dtype=np.int32)
+        for column in self.numbers:
+            self._arrays[column] = np.empty(0, dtype=np.float64)
+        self._size = 0
+        self.cursor: Optional[Tuple[str, str]] = None  # (time, id) of the last row read
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def watermark(self) -> Optional[str]:
+        return self.cursor[0] if self.cursor else None
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._arrays["ts"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for column, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[column] = grown
+
+    def _encode(self, column: str, value: Any) -> int:
+        label = "" if value is None else str(value)
+        codes = self.vocab[column]
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(codes)
+            self.labels[column].append(label)
+        return code
+
+    def append(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append new rows, skipping ones without a valid timestamp; returns the rows kept."""
+        stamps = [parse_timestamp(row.get(self.time_column)) for row in rows]
+        rows = [row for row, ts in zip(rows, stamps) if ts is not None]
+        stamps = [ts for ts in stamps if ts is not None]
+        if not rows:
+            return []
+
+        self._reserve(len(rows))
+        start, end = self._size, self._size + len(rows)
+        self._arrays["ts"][start:end] = stamps
+        for column in self.categories:
+            self._arrays[column][start:end] = [self._encode(column, row.get(column)) for row in rows]
+        for column in self.numbers:
+            self._arrays[column][start:end] = [parse_number(row.get(column)) for row in rows]
+        self._size = end
+        return rows
+
+    def view(self, since: Optional[int] = None, until: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Return column slices for rows in [since, until)."""
+        size = self._size
+        columns = {column: array[:size] for column, array in self._arrays.items()}
+        if since is None and until is None:
+            return columns
+        mask = np.ones(size, dtype=bool)
+        if since is not None:
+            mask &= columns["ts"] >= since
+        if until is not None:
+            mask &= columns["ts"] < until
+        return {column: array[mask] for column, array in columns.items()}
+
+
+class AnalyticsCache:
+    """Local columnar copies of seo_signals, mentions and posts, refreshed incrementally."""
+
+    def __init__(self):
+        self.tables = {
+            name: ColumnarTable(name, spec["time"], spec["categories"], spec["numbers"])
+            for name, spec in TABLE_COLUMNS.items()
+        }
+        self.version = 0
+        self.refreshed_at: Optional[str] = None
+        self._refresh_lock = threading.Lock()
+        self._listeners: List[Callable[[str, List[Dict[str, Any]]], None]] = []
+
+    def add_listener(self, listener: Callable[[str, List[Dict[str, Any]]], None]) -> None:
+        """Register `listener(table, rows)` to receive rows as they enter the cache."""
+        self._listeners.append(listener)
+
+    def _notify(self, name: str, rows: List[Dict[str, Any]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(name, rows)
+            except Exception as e:
+                logger.error(f"❌ Analytics listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    def refresh(self, supabase) -> Dict[str, int]:
+        """Pull rows after each table's (time, id) cursor from Supabase (blocking)."""
+        if supabase is None:
+            return {}
+        added = {}
+        with self._refresh_lock:
+            for name, table in self.tables.items():
+                added[name] = 0
+                try:
+                    while True:
+                        rows = fetch_after(supabase, name, table.time_column, table.cursor)
+                        if not rows:
+                            break
+                        new_rows = table.append(rows)
+                        if new_rows:
+                            self._notify(name, new_rows)
+                        added[name] += len(new_rows)
+                        cursor = row_key(rows[-1], table.time_column)
+                        if cursor is None:
+                            break  # only rows without a timestamp remain; they sort last
+                        table.cursor = cursor
+                        if len(rows) < PAGE_SIZE:
+                            break
+                except Exception as e:
+                    logger.error(f"❌ Analytics refresh of {name} failed: {e}")
+            self.refreshed_at = datetime.now(timezone.utc).isoformat()
+            self.version += 1
+        logger.info(f"📊 Analytics cache refreshed: {added}")
+        return added
+
+    def mention_volume(self, bucket: str, since: Optional[int], until: Optional[int], brand: Optional[str]) -> List[Dict]:
+        """Mention counts and average sentiment per time bucket and brand."""
+        table = self.tables["mentions"]
+        data = table.view(since, until)
+        if brand is not None:
+            code = table.vocab["brand"].get(brand)
+            if code is None:
+                return []
+            keep = data["brand"] == code
+            data = {column: array[keep] for column, array in data.items()}
+        if not len(data["ts"]):
+            return []
+
+        width = BUCKET_SECONDS[bucket]
+        buckets = data["ts"] // width
+        keys, inverse = np.unique(np.stack([buckets, data["brand"].astype(np.int64)], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, minlength=len(keys))
+        sentiment = data["sentiment"]
+        scored = ~np.isnan(sentiment)
+        scored_counts = np.bincount(inverse[scored], minlength=len(keys))
+        sentiment_sums = np.bincount(inverse[scored], weights=sentiment[scored], minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = sentiment_sums / scored_counts
+
+        labels = table.labels["brand"]
+        return [
+            {
+                "bucket_start": iso(keys[i, 0] * width),
+                "brand": labels[keys[i, 1]],
+                "mentions": int(counts[i]),
+                "avg_sentiment": None if scored_counts[i] == 0 else round(float(averages[i]), 4)
+            }
+            for i in range(len(keys))
+        ]
+
+    def keyword_rank_deltas(self, since: Optional[int], until: Optional[int], limit: int) -> List[Dict]:
+        """First and last observed rank per keyword in the window; positive delta = improved."""
+        table = self.tables["seo_signals"]
+        data = table.view(since, until)
+        ranked = ~np.isnan(data["rank"])
+        keywords, stamps, ranks = data["keyword"][ranked], data["ts"][ranked], data["rank"][ranked]
+        if not len(keywords):
+            return []
+
+        order = np.lexsort((stamps, keywords))
+        keywords, ranks = keywords[order], ranks[order]
+        unique, first = np.unique(keywords, return_index=True)
+        last = np.append(first[1:], len(keywords)) - 1
+        deltas = ranks[first] - ranks[last]
+
+        top = np.argsort(-np.abs(deltas), kind="stable")[:limit]
+        labels = table.labels["keyword"]
+        return [
+            {
+                "keyword": labels[unique[i]],
+                "first_rank": float(ranks[first[i]]),
+                "last_rank": float(ranks[last[i]]),
+                "delta": float(deltas[i]),
+                "observations": int(last[i] - first[i] + 1)
+            }
+            for i in top
+        ]
+
+    def post_engagement(self, bucket: Optional[str], since: Optional[int], until: Optional[int]) -> List[Dict]:
+        """Post counts and engagement totals per platform (and time bucket)."""
+        table = self.tables["posts"]
+        data = table.view(since, until)
+        if not len(data["ts"]):
+            return []
+
+        width = BUCKET_SECONDS[bucket] if bucket else None
+        buckets = data["ts"] // width if width else np.zeros(len(data["ts"]), dtype=np.int64)
+        keys, inverse = np.unique(np.stack([buckets, data["platform"].astype(np.int64)], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, minlength=len(keys))
+        totals = {
+            metric: np.bincount(inverse, weights=np.nan_to_num(data[metric]), minlength=len(keys))
+            for metric in table.numbers
+        }
+        engagement = sum(totals.values())
+
+        labels = table.labels["platform"]
+        rows = []
+        for i in range(len(keys)):
+            row = {"platform": labels[keys[i, 1]], "posts": int(counts[i])}
+            if width:
+                row["bucket_start"] = iso(keys[i, 0] * width)
+            for metric, values in totals.items():
+                row[metric] = int(values[i])
+            row["engagement"] = int(engagement[i])
+            row["avg_engagement"] = round(float(engagement[i] / counts[i]), 2)
+            rows.append(row)
+        return rows
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "refreshed_at": self.refreshed_at,
+            "rows": {name: len(table) for name, table in self.tables.items()},
+            "watermarks": {name: table.watermark for name, table in self.tables.items()}
+        }
+
+
+analytics_cache = AnalyticsCache()
+
+
+def refresh_worker(supabase) -> None:
+    """Scheduler refresh hook, run in every worker: fold newly collected rows into the cache."""
+    analytics_cache.refresh(supabase)
+
+router = APIRouter(prefix="/api/analytics")
+
+
+def _window(since: Optional[str], until: Optional[str]):
+    bounds = []
+    for name, value in (("since", since), ("until", until)):
+        if value is None:
+            bounds.append(None)
+            continue
+        ts = parse_timestamp(value)
+        if ts is None:
+            raise HTTPException(status_code=400, detail=f"Invalid {name}: {value}")
+        bounds.append(ts)
+    return bounds
+
+
+def _bucket(bucket: Optional[str]) -> Optional[str]:
+    if bucket is not None and bucket not in BUCKET_SECONDS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {sorted(BUCKET_SECONDS)}")
+    return bucket
+
+
+@router.get("")
+def analytics_status(request: Request):
+    return cached_json(request, "analytics_status", analytics_cache.version, analytics_cache.status)
+
+
+@router.get("/mentions")
+def mention_volume(request: Request, bucket: str = "day", since: Optional[str] = None, until: Optional[str] = None, brand: Optional[str] = None):
+    """Mention volume and average sentiment over time."""
+    bucket = _bucket(bucket)
+    start, end = _window(since, until)
+    return cached_json(
+        request, ("analytics_mentions", bucket, since, until, brand), analytics_cache.version,
+        lambda: {"bucket": bucket, "series": analytics_cache.mention_volume(bucket, start, end, brand)}
+    )
+
+
+@router.get("/keywords")
+def keyword_rank_deltas(request: Request, since: Optional[str] = None, until: Optional[str] = None, limit: int = 50):
+    """Keyword rank changes between the first and last observation in the window."""
+    start, end = _window(since, until)
+    limit = max(1, min(limit, 1000))
+    return cached_json(
+        request, ("analytics_keywords", since, until, limit), analytics_cache.version,
+        lambda: {"keywords": analytics_cache.keyword_rank_deltas(start, end, limit)}
+    )
+
+
+@router.get("/posts")
+def post_engagement(request: Request, bucket: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    """Post engagement rollups per platform, optionally per time bucket."""
+    bucket = _bucket(bucket)
+    start, end = _window(since, until)
+    return cached_json(
+        request, ("analytics_posts", bucket, since, until), analytics_cache.version,
+        lambda: {"bucket": bucket, "platforms": analytics_cache.post_engagement(bucket, start, end)}
+    )
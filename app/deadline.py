@@ -0,0 +1,32 @@
+import time
+from typing import Dict, Optional
+
+class DeadlineExceeded(Exception):
+    """Raised when a chat turn runs out of its request budget."""
+
+def deadline_after(seconds: float) -> float:
+    """Absolute deadline on the monotonic clock."""
+    return time.monotonic() + seconds
+
+def time_left(deadline: float) -> float:
+    """Seconds left before an absolute deadline (negative once it has passed)."""
+    return deadline - time.monotonic()
+
+def remaining(state: Dict) -> Optional[float]:
+    """Seconds left before the state's deadline, or None if it has none."""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return None
+    return time_left(deadline)
+
+def check(state: Dict, stage: str) -> None:
+    """Fail fast if the deadline has already passed."""
+    left = remaining(state)
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {stage}")
+
+def upstream_timeout(state: Dict, default: float) -> float:
+    """Timeout for an upstream call: the default, capped by the remaining budget."""
+    check(state, "upstream call")
+    left = remaining(state)
+    return default if left is None else min(default, left)
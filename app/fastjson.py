@@ -0,0 +1,18 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
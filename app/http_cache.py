@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+
+
+class CachedBody:
+    """A pre-serialized JSON body with its ETag and lazily compressed variants."""
+
+    __slots__ = ("body", "etag", "_encoded")
+
+    def __init__(self, payload: Any):
+        self.body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        """Return the body in the given content encoding, compressing once."""
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = data
+        return data
+
+
+class ResponseCache:
+    """Cache of serialized bodies, rebuilt only when the state version changes."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: Dict[Any, Tuple[Any, CachedBody]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, version: Any, build: Callable[[], Any]) -> CachedBody:
+        """Return the cached body for `key`, calling `build` if it is stale."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        cached = CachedBody(build())
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (version, cached)
+        return cached
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def render(cached: CachedBody, if_none_match: Optional[str], accept_encoding: Optional[str]) -> Tuple[int, Dict[str, str], bytes]:
+    """Build (status, headers, content) for a cached body, framework agnostic."""
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(if_none_match, cached.etag):
+        return 304, headers, b""
+
+    headers["Content-Type"] = "application/json"
+    encoding = None
+    if len(cached.body) >= COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(accept_encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return 200, headers, cached.encoded(encoding)
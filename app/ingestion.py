@@ -0,0 +1,257 @@
+"""
+MORVO Phase 4 - Bulk Ingestion
+Normalizes raw edge function records, drops ones already seen by content hash,
+and writes the rest to Supabase with chunked bulk upserts
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the index is then only safe for one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Sources listed here are written by this service instead of by their edge function:
+# the edge function is called with {"store": false} and must skip its own insert
+INGEST_SOURCES = {s.strip() for s in os.environ.get('INGEST_SOURCES', '').split(',') if s.strip()}
+INGEST_CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', 500))
+INGEST_INDEX_PATH = os.environ.get('INGEST_INDEX_PATH', 'ingest_hashes.bin')
+INGEST_INDEX_MAX = int(os.environ.get('INGEST_INDEX_MAX', 1_000_000))
+INGEST_ON_CONFLICT = os.environ.get('INGEST_ON_CONFLICT', '')
+
+SOURCE_TABLES = {
+    'seo': 'seo_signals',
+    'mentions': 'mentions',
+    'posts': 'posts'
+}
+
+# Fields that change between pulls without the content changing
+VOLATILE_FIELDS = frozenset(('created_at', 'updated_at', 'inserted_at', 'fetched_at'))
+HASH_SIZE = 8
+EDGE_SKIP_STORE = {'store': False}
+
+
+def normalize_value(value):
+    """Strip strings, convert Decimals and drop nulls, recursively"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {k: normalize_value(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [normalize_value(v) for v in value]
+    return value
+
+
+def content_hash(record):
+    """Stable 8-byte hash of a normalized record's non-volatile content"""
+    content = {k: v for k, v in record.items() if k not in VOLATILE_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=HASH_SIZE).digest()
+
+
+class HashIndex:
+    """Persisted set of content hashes stored as fixed-size entries in a binary file.
+
+    In memory the hashes are 64-bit integers: a sorted NumPy array searched with
+    np.searchsorted, plus a small set of recent additions that is merged into it
+    in bulk, so a million entries take about 16 MB (sorted copy plus insertion
+    order) instead of a dict of bytes objects.
+
+    The file is append-only; once the set grows past `max_entries` the oldest
+    half is evicted and the file is replaced atomically. Appends and rewrites
+    hold an exclusive lock on `<path>.lock` so workers sharing the file never
+    interleave partial entries.
+    """
+
+    PENDING_MAX = 4096
+
+    def __init__(self, path=INGEST_INDEX_PATH, max_entries=INGEST_INDEX_MAX):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._order = []  # insertion-ordered uint64 chunks, used for eviction
+        self._pending = {}  # recent additions not yet merged, insertion-ordered
+
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            loaded = np.frombuffer(data, dtype='<u8', count=len(data) // HASH_SIZE).astype(np.uint64)
+            self._order = [loaded]
+            self._sorted = np.unique(loaded)
+            logger.info(f"✅ Loaded {len(self._sorted)} ingestion hashes")
+
+    def __contains__(self, digest):
+        value = int.from_bytes(digest, 'little')
+        if value in self._pending:
+            return True
+        sorted_hashes = self._sorted
+        i = np.searchsorted(sorted_hashes, np.uint64(value))
+        return i < len(sorted_hashes) and int(sorted_hashes[i]) == value
+
+    def __len__(self):
+        return len(self._sorted) + len(self._pending)
+
+    def add_many(self, digests):
+        """Record hashes of written records and persist them"""
+        with self._lock:
+            new = [d for d in digests if d not in self]
+            for digest in new:
+                self._pending[int.from_bytes(digest, 'little')] = None
+
+            if len(self) > self.max_entries:
+                self._merge()
+                keep = np.concatenate(self._order)[-(self.max_entries // 2):]
+                self._order = [keep]
+                self._sorted = np.unique(keep)
+                self._rewrite(keep.astype('<u8').tobytes())
+            elif new:
+                if len(self._pending) >= self.PENDING_MAX:
+                    self._merge()
+                self._append(b''.join(new))
+
+    def _merge(self):
+        if not self._pending:
+            return
+        added = np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending))
+        self._order.append(added)
+        added = np.sort(added)
+        self._sorted = np.insert(self._sorted, np.searchsorted(self._sorted, added), added)
+        self._pending = {}  # cleared last so lock-free readers always find every hash
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.path + '.lock', 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _append(self, data):
+        if not self.path:
+            return
+        try:
+            with self._file_lock(), open(self.path, 'ab') as f:
+                f.write(data)
+        except OSError as e:
+            logger.error(f"❌ Failed to persist ingestion index: {e}")
+
+    def _rewrite(self, data):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with self._file_lock():
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"❌ Failed to rewrite ingestion index: {e}")
+
+
+class IngestionBatch:
+    """Dedupe and upsert records for one source during one collection run"""
+
+    def __init__(self, table, client, index, chunk_size=INGEST_CHUNK_SIZE, on_conflict=INGEST_ON_CONFLICT, autoflush=True):
+        self.table = table
+        self.autoflush = autoflush
+        self.client = client
+        self.index = index
+        self.chunk_size = chunk_size
+        self.on_conflict = on_conflict
+        self._pending = []
+        self._pending_hashes = set()
+        self.received = 0
+        self.duplicates = 0
+        self.written = 0
+        self.failed = 0
+
+    def add(self, record):
+        """Queue a raw record unless its content was already ingested"""
+        self.received += 1
+        if not isinstance(record, dict):
+            self.failed += 1
+            return
+
+        record = normalize_value(record)
+        digest = content_hash(record)
+        if digest in self.index or digest in self._pending_hashes:
+            self.duplicates += 1
+            return
+
+        self._pending.append((digest, record))
+        self._pending_hashes.add(digest)
+        if self.autoflush and self.full:
+            self.flush()
+
+    @property
+    def full(self):
+        return len(self._pending) >= self.chunk_size
+
+    def flush(self):
+        """Upsert queued records, one request per chunk"""
+        pending, self._pending = self._pending, []
+        self._pending_hashes = set()
+        for i in range(0, len(pending), self.chunk_size):
+            self._upsert(pending[i:i + self.chunk_size])
+
+    def _upsert(self, chunk):
+        try:
+            query = self.client.table(self.table)
+            rows = [record for _, record in chunk]
+            if self.on_conflict:
+                query.upsert(rows, on_conflict=self.on_conflict).execute()
+            else:
+                query.upsert(rows).execute()
+        except Exception as e:
+            logger.error(f"❌ Bulk upsert into {self.table} failed: {e}")
+            self.failed += len(chunk)
+            return
+
+        self.index.add_many([digest for digest, _ in chunk])
+        self.written += len(chunk)
+
+    def stats(self):
+        return {
+            'table': self.table,
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'written': self.written,
+            'failed': self.failed
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Lazily load the shared hash index"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HashIndex()
+    return _index
+
+
+def edge_request_body(source):
+    """Request body for a source's edge function; ingested sources ask it not to insert"""
+    return dict(EDGE_SKIP_STORE) if source in INGEST_SOURCES else {}
+
+
+def start_batch(source, client, autoflush=True):
+    """Return an IngestionBatch for the source, or None if ingestion is off for it"""
+    if source not in INGEST_SOURCES or source not in SOURCE_TABLES or client is None:
+        return None
+    return IngestionBatch(SOURCE_TABLES[source], client, get_index(), autoflush=autoflush)
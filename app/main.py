@@ -1,17 +1,40 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.state import ChatRequest, ChatResponse
+from app.state import BatchChatRequest, ChatRequest, ChatResponse
+from app.agent_graph import run_turn
+from app.admission import Overloaded, chat_admission
+from app.deadline import DeadlineExceeded, deadline_after, time_left
+from app.memory import memory
 from app.supabase_client import test_supabase_connection
+from app.responses import FastJSONResponse, cached_json
+from app.fastjson import dumps
+from app import analytics, retrieval, rollups, scheduler
 
 # Load environment variables
 load_dotenv()
 
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 8))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", 60))
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", 30))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the Phase 4 collector on this event loop for the app's lifetime."""
+    await scheduler.startup()
+    yield
+    await scheduler.shutdown()
+
 app = FastAPI(
     title="MORVO - AI Marketing Assistant",
     description="A bilingual (Arabic/English) marketing strategist focused on ROI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -23,22 +46,119 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Phase 4 collector routes, served alongside the assistant
+app.include_router(scheduler.router)
+app.include_router(analytics.router)
+app.include_router(rollups.router)
+scheduler.scheduler.add_refresh_hook(analytics.refresh_worker)
+scheduler.scheduler.add_cycle_hook(rollups.refresh_after_cycle)
+analytics.analytics_cache.add_listener(retrieval.index_rows)
+analytics.analytics_cache.add_listener(rollups.fold_rows)
+
 @app.get("/")
-def root():
-    return {
+def root(request: Request):
+    return cached_json(request, "root", 0, lambda: {
         "message": "👋 MORVO is ready to skyrocket your ROI!",
         "docs_url": "/docs",
         "supported_languages": ["English", "Arabic (العربية)"]
-    }
+    })
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Chat endpoint."""
+async def chat(request: ChatRequest, x_request_timeout: float | None = Header(default=None)):
+    """Chat endpoint.
+    
+    The turn gets a deadline (CHAT_DEADLINE_SECONDS, or a shorter X-Request-Timeout
+    header) that is carried through the graph, and is shed with 503 when the
+    server is already at capacity.
+    """
+    if not request.user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+    if x_request_timeout is not None and x_request_timeout <= 0:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout must be positive")
+    budget = CHAT_DEADLINE_SECONDS if x_request_timeout is None else min(x_request_timeout, CHAT_DEADLINE_SECONDS)
+    deadline = deadline_after(budget)
+    
     try:
-        # For now, just echo back the message
-        return ChatResponse(response=f"Echo: {request.message}", history=[request.message])
+        async with chat_admission.admit(budget):
+            state = await run_turn(request.user_id, request.message, deadline)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    history = [m.get("content", "") for m in memory.get_conversation_history(request.user_id)]
+    return FastJSONResponse({"response": state.get("history", ""), "history": history})
+
+@app.get("/chat/stats")
+def chat_stats():
+    """Admission control counters, including how many requests were shed, and
+    how much collected data this worker's retrieval index holds."""
+    return {
+        **chat_admission.stats(),
+        "retrieval_docs": len(retrieval.retrieval_index),
+        "analytics_refreshed_at": analytics.analytics_cache.refreshed_at
+    }
+
+@app.post("/chat/batch")
+async def chat_batch(batch: BatchChatRequest):
+    """Run many chat items through the agent graph and stream NDJSON results as they complete.
+
+    Items for the same user run in order; different users run concurrently,
+    bounded by max_concurrency. Each item has its own timeout and failure.
+    """
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    concurrency = max(1, min(batch.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    if batch.item_timeout is not None and batch.item_timeout <= 0:
+        raise HTTPException(status_code=400, detail="item_timeout must be positive")
+    timeout = min(batch.item_timeout or BATCH_ITEM_TIMEOUT, BATCH_ITEM_TIMEOUT)
+    
+    # One ordered lane per user; items without a user_id each get their own lane
+    lanes = {}
+    for index, item in enumerate(batch.items):
+        lanes.setdefault(item.user_id or f"__item_{index}", []).append((index, item))
+    
+    slots = asyncio.Semaphore(concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    
+    async def run_lane(items):
+        for index, item in items:
+            line = {"index": index, "user_id": item.user_id}
+            try:
+                async with slots:
+                    if not item.user_id:
+                        raise ValueError("user_id is required")
+                    # Time spent queued for admission counts against the item's budget, as for /chat
+                    deadline = deadline_after(timeout)
+                    async with chat_admission.admit(timeout):
+                        state = await asyncio.wait_for(
+                            run_turn(item.user_id, item.message, deadline), time_left(deadline)
+                        )
+                if state.get("error"):
+                    line.update(status="error", error=state["error"])
+                else:
+                    line.update(status="ok", response=state.get("history", ""))
+            except Overloaded as e:
+                line.update(status="shed", error=str(e))
+            except (asyncio.TimeoutError, DeadlineExceeded):
+                line.update(status="timeout", error=f"Timed out after {timeout}s")
+            except Exception as e:
+                line.update(status="error", error=str(e))
+            await results.put(line)
+    
+    async def stream():
+        tasks = [asyncio.create_task(run_lane(items)) for items in lanes.values()]
+        try:
+            for _ in range(len(batch.items)):
+                line = await results.get()
+                yield dumps(line) + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 @app.get("/test-supabase")
 def test_supabase():
@@ -1,5 +1,16 @@
-from typing import Dict, Optional, List
+import os
+import sqlite3
+import threading
 from datetime import datetime
+from typing import Dict, Optional, List
+from .fastjson import dumps, loads
+
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "sqlite")  # sqlite | memory
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "morvo_sessions.db")
+
+def utc_now_iso() -> str:
+    """Current UTC time as an ISO string; call once per turn and reuse it."""
+    return datetime.utcnow().isoformat()
 
 class TemporaryMemory:
     """Temporary in-memory storage until Supabase is ready."""
@@ -10,9 +21,10 @@ class TemporaryMemory:
     
     def save_user_profile(self, user_id: str, profile: Dict) -> None:
         """Save or update user profile."""
+        now = utc_now_iso()
         if user_id not in self._users:
-            profile["created_at"] = datetime.utcnow().isoformat()
-        profile["updated_at"] = datetime.utcnow().isoformat()
+            profile["created_at"] = now
+        profile["updated_at"] = now
         self._users[user_id] = profile
     
     def get_user_profile(self, user_id: str) -> Optional[Dict]:
@@ -24,7 +36,8 @@ class TemporaryMemory:
         if user_id not in self._conversations:
             self._conversations[user_id] = []
         
-        message["timestamp"] = datetime.utcnow().isoformat()
+        if not message.get("timestamp"):
+            message["timestamp"] = utc_now_iso()
         self._conversations[user_id].append(message)
     
     def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
@@ -36,7 +49,103 @@ class TemporaryMemory:
         """Update a specific field in user profile."""
         if user_id in self._users:
             self._users[user_id][field] = value
-            self._users[user_id]["updated_at"] = datetime.utcnow().isoformat()
+            self._users[user_id]["updated_at"] = utc_now_iso()
+
+class SqliteMemory:
+    """TemporaryMemory backed by a shared SQLite file, so every worker on the host sees the same sessions.
+
+    Each thread keeps its own connection and a small profile cache; the cache is
+    dropped whenever PRAGMA data_version shows another connection has committed.
+    """
+    
+    _SELECT_PROFILE = "SELECT profile FROM users WHERE user_id = ?"
+    _UPSERT_PROFILE = (
+        "INSERT INTO users (user_id, profile) VALUES (?, ?) "
+        "ON CONFLICT (user_id) DO UPDATE SET profile = excluded.profile"
+    )
+    _UPDATE_FIELD = "UPDATE users SET profile = json_set(profile, ?, ?, '$.updated_at', ?) WHERE user_id = ?"
+    _INSERT_MESSAGE = "INSERT INTO conversations (user_id, timestamp, message) VALUES (?, ?, ?)"
+    _SELECT_HISTORY = (
+        "SELECT message FROM conversations WHERE user_id = ? "
+        "ORDER BY timestamp DESC, id DESC LIMIT ?"
+    )
+    
+    def __init__(self, path: str = MEMORY_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (user_id TEXT PRIMARY KEY, profile TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                message TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversations_user_time ON conversations (user_id, timestamp);
+        """)
+    
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, cached_statements=32)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.cache = {}
+            self._local.data_version = None
+        return conn
+    
+    def _cache(self) -> Dict[str, Dict]:
+        """Per-thread profile cache, cleared when another connection has written."""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._local.data_version:
+            self._local.cache.clear()
+            self._local.data_version = version
+        return self._local.cache
+    
+    def save_user_profile(self, user_id: str, profile: Dict) -> None:
+        """Save or update user profile."""
+        now = utc_now_iso()
+        if not profile.get("created_at") or self.get_user_profile(user_id) is None:
+            profile["created_at"] = now
+        profile["updated_at"] = now
+        self._connection().execute(self._UPSERT_PROFILE, (user_id, dumps(profile)))
+        self._cache()[user_id] = dict(profile)
+    
+    def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        """Get user profile by ID."""
+        cache = self._cache()
+        profile = cache.get(user_id)
+        if profile is None:
+            row = self._connection().execute(self._SELECT_PROFILE, (user_id,)).fetchone()
+            if row is None:
+                return None
+            profile = cache[user_id] = loads(row[0])
+        return dict(profile)
+    
+    def save_conversation(self, user_id: str, message: Dict) -> None:
+        """Save a conversation message."""
+        if not message.get("timestamp"):
+            message["timestamp"] = utc_now_iso()
+        self._connection().execute(
+            self._INSERT_MESSAGE,
+            (user_id, message["timestamp"], dumps(message))
+        )
+    
+    def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Get recent conversation history."""
+        rows = self._connection().execute(self._SELECT_HISTORY, (user_id, limit if limit else -1)).fetchall()
+        return [loads(row[0]) for row in reversed(rows)]
+    
+    def update_user_field(self, user_id: str, field: str, value: str) -> None:
+        """Update a specific field in user profile."""
+        self._connection().execute(
+            self._UPDATE_FIELD,
+            (f'$."{field}"', value, utc_now_iso(), user_id)
+        )
+        self._cache().pop(user_id, None)
 
-# Global instance for temporary storage
-memory = TemporaryMemory()
\ No newline at end of file
+# Global instance, shared across workers when SQLite-backed
+memory = SqliteMemory() if MEMORY_BACKEND == "sqlite" else TemporaryMemory()
\ No newline at end of file
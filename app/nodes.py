@@ -1,16 +1,24 @@
+import asyncio
 from typing import Dict
-from datetime import datetime
 from .state import ConversationState
 from .perplexity_client import PerplexityClient
 from .prompt_builder import PromptBuilder
-from .memory import memory
-from .models import ChatMessage, UserProfile
+from .memory import memory, utc_now_iso
+from .retrieval import retrieval_index
+from .deadline import DeadlineExceeded, check, remaining, upstream_timeout
 
-# Initialize Perplexity client
-perplexity = PerplexityClient()
+# Perplexity client is created on first use so the app can start without an API key
+_perplexity = None
+
+def get_perplexity() -> PerplexityClient:
+    global _perplexity
+    if _perplexity is None:
+        _perplexity = PerplexityClient()
+    return _perplexity
 
 async def router(state: ConversationState) -> Dict:
     """Route to appropriate node based on state."""
+    check(state, "routing")
     # Go to onboarding if any required field is missing
     if not state.get("name") or not state.get("role") or not state.get("goal"):
         return {"next": "onboarding"}
@@ -26,31 +34,30 @@ async def chat_node(state: ConversationState) -> Dict:
         # Load user profile from memory
         profile = memory.get_user_profile(user_id)
         if not profile:
-            profile = UserProfile(
-                name=state.get("name", ""),
-                role=state.get("role", ""),
-                goal=state.get("goal", ""),
-                language=state.get("language", "en")
-            ).dict()
+            profile = {
+                "name": state.get("name", ""),
+                "role": state.get("role", ""),
+                "goal": state.get("goal", ""),
+                "language": state.get("language", "en")
+            }
             memory.save_user_profile(user_id, profile)
         
+        # Ground the answer in the brand's own collected data
+        check(state, "retrieval")
+        context = retrieval_index.search(state.get("input", ""))
+        
         # Build prompt with user context
-        prompt_data = PromptBuilder.build_morvo_prompt(profile, state.get("input", ""))
+        check(state, "prompt building")
+        prompt_data = PromptBuilder.build_morvo_prompt(profile, state.get("input", ""), context)
         
         # Get response from Perplexity
-        response = await perplexity.chat(prompt_data["messages"])
+        timeout = upstream_timeout(state, get_perplexity().timeout)
+        response = await asyncio.wait_for(get_perplexity().chat(prompt_data["messages"], timeout=timeout), timeout)
         
         # Save conversation to memory
-        user_msg = ChatMessage(
-            role="user",
-            content=state.get("input", ""),
-            timestamp=datetime.utcnow()
-        ).dict()
-        assistant_msg = ChatMessage(
-            role="assistant",
-            content=response,
-            timestamp=datetime.utcnow()
-        ).dict()
+        now = utc_now_iso()
+        user_msg = {"role": "user", "content": state.get("input", ""), "timestamp": now}
+        assistant_msg = {"role": "assistant", "content": response, "timestamp": now}
         
         memory.save_conversation(user_id, user_msg)
         memory.save_conversation(user_id, assistant_msg)
@@ -61,7 +68,13 @@ async def chat_node(state: ConversationState) -> Dict:
             "messages": [user_msg, assistant_msg]
         }
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
+        left = remaining(state)
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("Deadline exceeded during chat") from e
+        
         # Handle errors gracefully
         error_msg = "I apologize, but I encountered an error. Could you please try again?"
         if state.get("language") == "ar":
@@ -69,5 +82,6 @@ async def chat_node(state: ConversationState) -> Dict:
         
         return {
             "history": error_msg,
-            "input": ""
+            "input": "",
+            "error": str(e) or type(e).__name__
         }
\ No newline at end of file
@@ -1,8 +1,6 @@
 from typing import Dict
-from datetime import datetime
 from .state import ConversationState
-from .memory import memory
-from .models import UserProfile, ChatMessage
+from .memory import memory, utc_now_iso
 
 def detect_language(text: str) -> str:
     """Simple language detection - returns 'ar' if Arabic characters found, else 'en'."""
@@ -76,14 +74,7 @@ def onboarding_node(state: ConversationState) -> Dict:
         updates["history"] = get_onboarding_message({"name": user_input}, lang)
         
         # Save initial profile
-        profile = UserProfile(
-            name=user_input,
-            role="",
-            goal="",
-            language=lang,
-            created_at=datetime.utcnow()
-        )
-        memory.save_user_profile(user_id, profile.dict())
+        memory.save_user_profile(user_id, {"name": user_input, "role": "", "goal": "", "language": lang})
         
     elif not state.get("role"):
         updates["role"] = user_input
@@ -105,12 +96,7 @@ def onboarding_node(state: ConversationState) -> Dict:
         updates["history"] = get_onboarding_message(state, lang)
     
     # Save the interaction
-    message = ChatMessage(
-        role="assistant",
-        content=updates["history"],
-        timestamp=datetime.utcnow()
-    )
-    memory.save_conversation(user_id, message.dict())
+    memory.save_conversation(user_id, {"role": "assistant", "content": updates["history"], "timestamp": utc_now_iso()})
     
     updates["input"] = ""  # Clear input after processing
     return updates
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+MORVO Phase 4 - Edge Function Payload Summaries
+Streams edge function responses and keeps only a compact summary per source
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+from datetime import datetime
+
+try:
+    import ijson
+except ImportError:  # optional: without it the body is parsed once and discarded
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SPILL_DIR = os.environ.get('PAYLOAD_SPILL_DIR', '')
+SPILL_MAX_BYTES = int(os.environ.get('PAYLOAD_SPILL_MAX_BYTES', 5 * 1024 * 1024))
+SPILL_KEEP = int(os.environ.get('PAYLOAD_SPILL_KEEP', 5))
+ERROR_SAMPLES = 3
+ERROR_KEYS = frozenset(('error', 'errors'))
+CHUNK_SIZE = 64 * 1024
+
+# ijson errors do not subclass ValueError; they are re-raised as ValueError
+IJSON_ERRORS = (ijson.JSONError,) if ijson is not None else ()
+
+
+class PayloadSpill:
+    """Size-capped on-disk copy of a raw payload, rotated per source"""
+
+    def __init__(self, directory, source, max_bytes=SPILL_MAX_BYTES, keep=SPILL_KEEP):
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        self.path = os.path.join(directory, f'{source}-{stamp}.json')
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.truncated = False
+        self._file = open(self.path, 'wb')
+        self._rotate(directory, source, keep)
+
+    def _rotate(self, directory, source, keep):
+        files = sorted(glob.glob(os.path.join(directory, f'{source}-*.json')))
+        for old in files[:-keep] if keep > 0 else files:
+            if old != self.path:
+                try:
+                    os.remove(old)
+                except OSError as e:
+                    logger.warning(f"⚠️  Could not rotate payload spill {old}: {e}")
+
+    def write(self, chunk):
+        room = self.max_bytes - self.written
+        if room <= 0:
+            self.truncated = True
+            return
+        if len(chunk) > room:
+            chunk = chunk[:room]
+            self.truncated = True
+        self._file.write(chunk)
+        self.written += len(chunk)
+
+    def close(self):
+        self._file.close()
+
+
+class AsyncChunkReader:
+    """File-like async reader over httpx response chunks that counts bytes and tees to a spill"""
+
+    def __init__(self, chunks, spill=None):
+        self._chunks = chunks.__aiter__()
+        self._buffer = b''
+        self.spill = spill
+        self.size = 0
+
+    async def _next_chunk(self):
+        async for chunk in self._chunks:
+            if chunk:
+                self.size += len(chunk)
+                if self.spill:
+                    self.spill.write(chunk)
+                return chunk
+        return b''
+
+    async def read(self, n=-1):
+        if n is None or n < 0:
+            parts = [self._buffer]
+            chunk = await self._next_chunk()
+            while chunk:
+                parts.append(chunk)
+                chunk = await self._next_chunk()
+            self._buffer = b''
+            return b''.join(parts)
+
+        while len(self._buffer) < n:
+            chunk = await self._next_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+
+def iter_events(obj, prefix=''):
+    """Yield (prefix, event, value) tuples for a parsed object, matching ijson.parse"""
+    if isinstance(obj, dict):
+        yield prefix, 'start_map', None
+        for key, value in obj.items():
+            yield prefix, 'map_key', key
+            yield from iter_events(value, f'{prefix}.{key}' if prefix else key)
+        yield prefix, 'end_map', None
+    elif isinstance(obj, list):
+        yield prefix, 'start_array', None
+        item_prefix = f'{prefix}.item' if prefix else 'item'
+        for value in obj:
+            yield from iter_events(value, item_prefix)
+        yield prefix, 'end_array', None
+    elif obj is None:
+        yield prefix, 'null', None
+    elif isinstance(obj, bool):
+        yield prefix, 'boolean', obj
+    elif isinstance(obj, (int, float)):
+        yield prefix, 'number', obj
+    else:
+        yield prefix, 'string', obj
+
+
+class RecordBuilder:
+    """Rebuild one JSON value from a stream of parse events"""
+
+    def __init__(self):
+        self.value = None
+        self._stack = []
+        self._key = None
+
+    def event(self, event, value):
+        if event == 'map_key':
+            self._key = value
+        elif event in ('start_map', 'start_array'):
+            container = {} if event == 'start_map' else []
+            self._put(container)
+            self._stack.append(container)
+        elif event in ('end_map', 'end_array'):
+            self._stack.pop()
+        else:
+            self._put(value)
+
+    def _put(self, value):
+        if not self._stack:
+            self.value = value
+        elif isinstance(self._stack[-1], list):
+            self._stack[-1].append(value)
+        else:
+            self._stack[-1][self._key] = value
+
+
+def _widen(id_range, value):
+    """Extend a [low, high] ID range, comparing as strings for mixed types"""
+    if id_range is None:
+        return [value, value]
+    low, high = id_range
+    try:
+        return [min(low, value), max(high, value)]
+    except TypeError:
+        return [min(str(low), str(value)), max(str(high), str(value))]
+
+
+class PayloadSummarizer:
+    """Fold a JSON event stream into record counts, ID range and error samples.
+
+    A record is any object that sits directly in an array and is not nested
+    inside another record or under an error key (`errors: [{...}]` entries are
+    only sampled as errors, never counted or ingested). When `on_record` is given, each record is rebuilt
+    and passed to it as soon as it ends, so only one record is held at a time.
+    """
+
+    def __init__(self, on_record=None):
+        self.on_record = on_record
+        self.records = 0
+        self.id_range = None
+        self.errors = []
+        self._record_prefix = None
+        self._builder = None
+        self._depth = 0
+
+    def feed(self, prefix, event, value):
+        if self._builder is not None:
+            self._builder.event(event, value)
+
+        if event == 'start_map':
+            if (self._record_prefix is None and (prefix == 'item' or prefix.endswith('.item'))
+                    and ERROR_KEYS.isdisjoint(prefix.split('.'))):
+                self._record_prefix = prefix
+                self._depth = 0
+                self.records += 1
+                if self.on_record is not None:
+                    self._builder = RecordBuilder()
+                    self._builder.event(event, value)
+            elif self._record_prefix is not None:
+                self._depth += 1
+            return
+        if event == 'end_map' and self._record_prefix is not None:
+            if self._depth == 0 and prefix == self._record_prefix:
+                self._record_prefix = None
+                if self._builder is not None:
+                    self.on_record(self._builder.value)
+                    self._builder = None
+            else:
+                self._depth -= 1
+            return
+
+        if event not in ('string', 'number'):
+            return
+        if self._record_prefix is not None and self._depth == 0 and prefix == f'{self._record_prefix}.id':
+            if event == 'number' and not isinstance(value, int):
+                value = float(value)  # ijson yields Decimal
+            self.id_range = _widen(self.id_range, value)
+        elif len(self.errors) < ERROR_SAMPLES and not ERROR_KEYS.isdisjoint(prefix.split('.')):
+            self.errors.append(str(value)[:200])
+
+    def summary(self):
+        summary = {'records': self.records, 'error_samples': self.errors}
+        if self.id_range:
+            summary['id_range'] = self.id_range
+        return summary
+
+
+def summarize_events(events, on_record=None):
+    """Summarize an iterable of (prefix, event, value) parse events"""
+    summarizer = PayloadSummarizer(on_record)
+    for prefix, event, value in events:
+        summarizer.feed(prefix, event, value)
+    return summarizer.summary()
+
+
+async def summarize_response_async(source, response, spill_dir=SPILL_DIR, batch=None):
+    """Stream an httpx response body into a compact summary; raises ValueError on malformed JSON.
+
+    Records go to `batch` (an IngestionBatch built with autoflush=False) and
+    each full chunk is upserted in a worker thread so the event loop never blocks.
+    """
+    spill = PayloadSpill(spill_dir, source) if spill_dir else None
+    reader = AsyncChunkReader(response.aiter_bytes(CHUNK_SIZE), spill)
+    summarizer = PayloadSummarizer(batch.add if batch else None)
+
+    try:
+        if ijson is not None:
+            events = ijson.parse_async(reader)
+        else:
+            events = _as_async(iter_events(json.loads(await reader.read() or b'null')))
+        async for prefix, event, value in events:
+            summarizer.feed(prefix, event, value)
+            if batch and batch.full:
+                await asyncio.to_thread(batch.flush)
+        await reader.read()
+    except IJSON_ERRORS as e:
+        raise ValueError(str(e)) from e
+    finally:
+        if spill:
+            spill.close()
+
+    summary = summarizer.summary()
+    summary['bytes'] = reader.size
+    if spill:
+        summary['spill_file'] = spill.path
+        summary['spill_truncated'] = spill.truncated
+    return summary
+
+
+async def _as_async(events):
+    for event in events:
+        yield event
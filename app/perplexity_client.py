@@ -1,6 +1,6 @@
 import os
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from dotenv import load_dotenv
 
 class PerplexityClient:
@@ -12,20 +12,21 @@ class PerplexityClient:
             raise ValueError("PERPLEXITY_API_KEY must be provided")
         
         self.base_url = "https://api.perplexity.ai"
+        self.timeout = 30.0
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
     
-    async def _make_request(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
-        """Make a request to the Perplexity API."""
+    async def _make_request(self, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Make a request to the Perplexity API, bounded by `timeout` seconds (default 30)."""
         data = {
             "model": "sonar",  # Using Sonar model
             "messages": messages
         }
             
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with httpx.AsyncClient(timeout=self.timeout if timeout is None else timeout) as client:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers=self.headers,
@@ -50,11 +51,11 @@ class PerplexityClient:
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    async def chat(self, message: str) -> str:
-        """Send a chat message to Perplexity."""
+    async def chat(self, message: Union[str, List[Dict[str, str]]], timeout: Optional[float] = None) -> str:
+        """Send a chat message (or a full message list) to Perplexity."""
         try:
-            messages = [{"role": "user", "content": message}]
-            response = await self._make_request(messages)
+            messages = message if isinstance(message, list) else [{"role": "user", "content": message}]
+            response = await self._make_request(messages, timeout)
             
             if not response or "choices" not in response:
                 raise Exception("Invalid response format from Perplexity API")
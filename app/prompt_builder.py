@@ -1,4 +1,4 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 class PromptBuilder:
     @staticmethod
@@ -46,12 +46,27 @@ class PromptBuilder:
         return prompt
     
     @staticmethod
-    def build_morvo_prompt(state: Dict, user_input: str) -> Dict:
+    def build_data_context(context: List[Dict], language: str = "en") -> str:
+        """Format retrieved brand records as a short grounding section."""
+        if language == "ar":
+            header = "بيانات ذات صلة من مراقبة علامتك التجارية (استخدمها عند الحاجة):\n"
+        else:
+            header = "Relevant data from the brand's own monitoring (use it where it helps):\n"
+        lines = [
+            f"- [{item.get('table')}{' ' + str(item['created_at'])[:10] if item.get('created_at') else ''}] {item['snippet']}"
+            for item in context
+        ]
+        return header + "\n".join(lines) + "\n\n"
+    
+    @staticmethod
+    def build_morvo_prompt(state: Dict, user_input: str, context: Optional[List[Dict]] = None) -> Dict:
         """Build the full prompt for Perplexity API."""
         messages = []
         
         # Add system prompt
         system_prompt = PromptBuilder.build_system_prompt(state)
+        if context:
+            system_prompt += PromptBuilder.build_data_context(context, state.get("language", "en"))
         messages.append({
             "role": "system",
             "content": system_prompt
@@ -0,0 +1,22 @@
+from fastapi import Request, Response
+from app.fastjson import dumps
+from app.http_cache import ResponseCache, render
+
+response_cache = ResponseCache()
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson when available, skipping response_model re-validation."""
+    media_type = "application/json"
+    
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def cached_json(request: Request, key, version, build) -> Response:
+    """Serve a JSON body from the response cache with ETag and compression."""
+    cached = response_cache.get(key, version, build)
+    status, headers, content = render(
+        cached,
+        request.headers.get("if-none-match"),
+        request.headers.get("accept-encoding")
+    )
+    return Response(content=content, status_code=status, headers=headers)
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+RETRIEVAL_DIM = int(os.getenv("RETRIEVAL_DIM", 512))
+RETRIEVAL_MAX_DOCS = int(os.getenv("RETRIEVAL_MAX_DOCS", 20000))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 3))
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", 0.15))
+SNIPPET_CHARS = 200
+
+# Fields joined into the searchable text of each collected record
+TEXT_FIELDS = {
+    "mentions": ("title", "content", "text", "source", "brand"),
+    "posts": ("post", "content", "text", "platform"),
+    "seo_signals": ("keyword", "url", "rank"),
+}
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+
+def _bucket(token: str, dim: int):
+    """Hash a token to a feature index and sign (signed hashing trick)."""
+    digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % dim, 1.0 if digest >> 63 else -1.0
+
+
+class HashedTfidfIndex:
+    """Offline vector index of collected records using hashed TF-IDF embeddings.
+
+    Documents are embedded with the document frequencies known when they are
+    added, queries with the current ones. Vectors live in a fixed-size ring
+    buffer and search is a brute-force dot product over L2-normalized rows.
+    """
+
+    def __init__(self, dim: int = RETRIEVAL_DIM, max_docs: int = RETRIEVAL_MAX_DOCS):
+        self.dim = dim
+        self.max_docs = max_docs
+        self._vectors = np.zeros((max_docs, dim), dtype=np.float32)
+        self._docs: List[Optional[Dict[str, Any]]] = [None] * max_docs
+        self._df = np.zeros(dim, dtype=np.float64)
+        self._total = 0  # documents ever added, drives idf
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _embed(self, tokens: List[str]) -> Optional[np.ndarray]:
+        counts: Dict[int, float] = {}
+        signs: Dict[int, float] = {}
+        for token in tokens:
+            index, sign = _bucket(token, self.dim)
+            counts[index] = counts.get(index, 0.0) + 1.0
+            signs[index] = sign
+        if not counts:
+            return None
+
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        idf = np.log((self._total + 1.0) / (self._df[indices] + 1.0)) + 1.0
+        vector = np.zeros(self.dim, dtype=np.float32)
+        vector[indices] = tf * idf * np.fromiter((signs[i] for i in counts), dtype=np.float64, count=len(counts))
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def add(self, text: str, metadata: Dict[str, Any]) -> bool:
+        """Index one document; the oldest is evicted once the index is full."""
+        tokens = tokenize(text)
+        if not tokens:
+            return False
+        with self._lock:
+            unique = {_bucket(token, self.dim)[0] for token in tokens}
+            self._df[list(unique)] += 1.0
+            self._total += 1
+            vector = self._embed(tokens)
+            if vector is None:
+                return False
+            slot = self._next
+            self._vectors[slot] = vector
+            self._docs[slot] = dict(metadata, snippet=text[:SNIPPET_CHARS])
+            self._next = (slot + 1) % self.max_docs
+            self._size = min(self._size + 1, self.max_docs)
+        return True
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K, min_score: float = RETRIEVAL_MIN_SCORE) -> List[Dict[str, Any]]:
+        """Top-k documents by cosine similarity to the query."""
+        tokens = tokenize(query)
+        with self._lock:
+            if not tokens or not self._size:
+                return []
+            vector = self._embed(tokens)
+            if vector is None:
+                return []
+            scores = self._vectors[:self._size] @ vector
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                dict(self._docs[i], score=round(float(scores[i]), 4))
+                for i in top
+                if scores[i] >= min_score
+            ]
+
+
+def record_text(table: str, row: Dict[str, Any]) -> str:
+    parts = [str(row[field]) for field in TEXT_FIELDS.get(table, ()) if row.get(field) not in (None, "")]
+    return " ".join(parts)
+
+
+retrieval_index = HashedTfidfIndex()
+
+
+def index_rows(table: str, rows: List[Dict[str, Any]]) -> None:
+    """Analytics cache listener: index newly collected records.
+
+    The analytics cache refreshes in every worker, so each worker builds its
+    own index rather than only the one running the collector.
+    """
+    for row in rows:
+        text = record_text(table, row)
+        if text:
+            retrieval_index.add(text, {"table": table, "id": row.get("id"), "created_at": row.get("created_at")})
@@ -0,0 +1,279 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+
+from app.analytics import PAGE_SIZE, TABLE_COLUMNS, fetch_after, iso, parse_number, parse_timestamp, row_key
+from app.responses import cached_json
+from app.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_DB_PATH = os.getenv("ROLLUP_DB_PATH", "rollups.db")
+# With the default, new rows arrive from the analytics cache instead of a second pull
+# of the same tables, and corrected or late rows from re-reading the last
+# ROLLUP_RESCAN_HOURS each cycle. Set to updated_at to follow changes by that column instead.
+ROLLUP_CHANGE_COLUMN = os.getenv("ROLLUP_CHANGE_COLUMN", "created_at")
+ROLLUP_RESCAN_HOURS = float(os.getenv("ROLLUP_RESCAN_HOURS", 48))
+MAX_METRICS = 3
+GRAINS = {"hour": 3600, "day": 86400}
+
+METRIC_COLUMNS = ", ".join(f"s{i} REAL, c{i} INTEGER" for i in range(MAX_METRICS))
+ROW_METRICS = ", ".join(f"m{i}" for i in range(MAX_METRICS))
+SUMS = ", ".join(f"SUM(m{i}), COUNT(m{i})" for i in range(MAX_METRICS))
+ROLLED_SUMS = ", ".join(f"SUM(s{i}), SUM(c{i})" for i in range(MAX_METRICS))
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS rollup_rows (
+    tbl TEXT NOT NULL, id TEXT NOT NULL, hour INTEGER NOT NULL, dim TEXT NOT NULL,
+    m0 REAL, m1 REAL, m2 REAL,
+    PRIMARY KEY (tbl, id)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_rows_bucket ON rollup_rows (tbl, hour);
+CREATE TABLE IF NOT EXISTS rollups (
+    tbl TEXT NOT NULL, grain TEXT NOT NULL, bucket INTEGER NOT NULL, dim TEXT NOT NULL,
+    n INTEGER NOT NULL, {METRIC_COLUMNS},
+    PRIMARY KEY (tbl, grain, bucket, dim)
+);
+DROP TABLE IF EXISTS rollup_watermarks;
+CREATE TABLE IF NOT EXISTS rollup_cursors (tbl TEXT PRIMARY KEY, value TEXT NOT NULL, id TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rollup_meta (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL);
+INSERT OR IGNORE INTO rollup_meta VALUES (1, 0);
+"""
+
+
+def _spec(table: str) -> Tuple[str, Tuple[str, ...]]:
+    """Dimension column and metric columns rolled up for a table."""
+    spec = TABLE_COLUMNS[table]
+    return spec["categories"][0], spec["numbers"][:MAX_METRICS]
+
+
+class RollupEngine:
+    """Hourly and daily aggregates kept in SQLite and maintained incrementally.
+
+    Each source row is remembered by id with its hour bucket and metric
+    values, so a late or corrected row only triggers re-aggregation of the
+    hour (and day) buckets it leaves and enters. The version row is bumped
+    with every rebuild, so workers sharing the database agree on it.
+    """
+
+    def __init__(self, path: str = ROLLUP_DB_PATH, change_column: str = ROLLUP_CHANGE_COLUMN):
+        self.change_column = change_column
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def fold(self, table: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Fold new or changed rows into the rollups; returns the number of buckets rebuilt."""
+        dim_column, metrics = _spec(table)
+        time_column = TABLE_COLUMNS[table]["time"]
+        affected: Set[int] = set()
+
+        with self._lock, self._conn:
+            for row in rows:
+                ts = parse_timestamp(row.get(time_column))
+                if ts is None or row.get("id") is None:
+                    continue
+                row_id = str(row["id"])
+                hour = ts - ts % GRAINS["hour"]
+                dim = "" if row.get(dim_column) is None else str(row[dim_column])
+                values = [parse_number(row.get(m)) for m in metrics]
+                values = [None if v != v else v for v in values]  # NaN -> NULL
+                values += [None] * (MAX_METRICS - len(values))
+                new = (hour, dim, *values)
+
+                old = self._conn.execute(
+                    f"SELECT hour, dim, {ROW_METRICS} FROM rollup_rows WHERE tbl = ? AND id = ?",
+                    (table, row_id)
+                ).fetchone()
+                if old == new:
+                    continue
+                if old:
+                    affected.add(old[0])
+                affected.add(hour)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO rollup_rows (tbl, id, hour, dim, {ROW_METRICS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (table, row_id, *new)
+                )
+
+            self._rebuild(table, affected)
+
+        return len(affected)
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT version FROM rollup_meta WHERE id = 1").fetchone()[0]
+
+    def _rebuild(self, table: str, hours: Set[int]) -> None:
+        """Recompute the given hour buckets and the days containing them (in the caller's transaction)."""
+        if not hours:
+            return
+        self._conn.execute("UPDATE rollup_meta SET version = version + 1 WHERE id = 1")
+        day_width = GRAINS["day"]
+        for hour in hours:
+            self._conn.execute("DELETE FROM rollups WHERE tbl = ? AND grain = 'hour' AND bucket = ?", (table, hour))
+            self._conn.execute(
+                f"INSERT INTO rollups SELECT tbl, 'hour', hour, dim, COUNT(*), {SUMS} "
+                "FROM rollup_rows WHERE tbl = ? AND hour = ? GROUP BY dim",
+                (table, hour)
+            )
+        for day in {hour - hour % day_width for hour in hours}:
+            self._conn.execute("DELETE FROM rollups WHERE tbl = ? AND grain = 'day' AND bucket = ?", (table, day))
+            self._conn.execute(
+                f"INSERT INTO rollups SELECT tbl, 'day', ?, dim, SUM(n), {ROLLED_SUMS} "
+                "FROM rollups WHERE tbl = ? AND grain = 'hour' AND bucket >= ? AND bucket < ? GROUP BY dim",
+                (day, table, day, day + day_width)
+            )
+
+    @property
+    def follows_analytics(self) -> bool:
+        """True when the change column is the analytics time column, so cached rows are enough."""
+        return all(spec["time"] == self.change_column for spec in TABLE_COLUMNS.values())
+
+    def _cursor(self, table: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, id FROM rollup_cursors WHERE tbl = ?", (table,)).fetchone()
+        return tuple(row) if row else None
+
+    def _set_cursor(self, table: str, cursor: Tuple[str, str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO rollup_cursors (tbl, value, id) VALUES (?, ?, ?)", (table, *cursor))
+
+    def refresh(self, supabase) -> Dict[str, int]:
+        """Pull rows after each table's (change column, id) cursor and fold them in (blocking)."""
+        if supabase is None:
+            return {}
+        rebuilt = {}
+        for table in TABLE_COLUMNS:
+            rebuilt[table] = 0
+            try:
+                while True:
+                    rows = fetch_after(supabase, table, self.change_column, self._cursor(table))
+                    if not rows:
+                        break
+                    rebuilt[table] += self.fold(table, rows)
+                    cursor = row_key(rows[-1], self.change_column)
+                    if cursor is None:
+                        break  # only rows without a change value remain; they sort last
+                    self._set_cursor(table, cursor)
+                    if len(rows) < PAGE_SIZE:
+                        break
+            except Exception as e:
+                logger.error(f"❌ Rollup refresh of {table} failed: {e}")
+        logger.info(f"📈 Rollup buckets rebuilt: {rebuilt}")
+        return rebuilt
+
+    def rescan(self, supabase, hours: float = ROLLUP_RESCAN_HOURS) -> Dict[str, int]:
+        """Re-read rows in the trailing window of buckets and fold them in (blocking).
+
+        Folding is a no-op for unchanged rows, so only buckets holding a
+        corrected row, or a late row behind the analytics cursor, are rebuilt.
+        """
+        if supabase is None or hours <= 0:
+            return {}
+        since = iso(int(time.time() - hours * 3600))
+        rebuilt = {}
+        for table, spec in TABLE_COLUMNS.items():
+            rebuilt[table] = 0
+            cursor = None
+            try:
+                while True:
+                    rows = fetch_after(supabase, table, spec["time"], cursor, since=since)
+                    if not rows:
+                        break
+                    rebuilt[table] += self.fold(table, rows)
+                    cursor = row_key(rows[-1], spec["time"])
+                    if cursor is None or len(rows) < PAGE_SIZE:
+                        break
+            except Exception as e:
+                logger.error(f"❌ Rollup rescan of {table} failed: {e}")
+        logger.info(f"📈 Rollup buckets rebuilt by rescan: {rebuilt}")
+        return rebuilt
+
+    def query(self, table: str, grain: str, since: Optional[int], until: Optional[int], dim: Optional[str]) -> List[Dict]:
+        """Read precomputed buckets, oldest first."""
+        dim_column, metrics = _spec(table)
+        sql = f"SELECT bucket, dim, n, {', '.join(f's{i}, c{i}' for i in range(len(metrics)))} FROM rollups WHERE tbl = ? AND grain = ?"
+        params: List[Any] = [table, grain]
+        if since is not None:
+            sql += " AND bucket >= ?"
+            params.append(since - since % GRAINS[grain])
+        if until is not None:
+            sql += " AND bucket < ?"
+            params.append(until)
+        if dim is not None:
+            sql += " AND dim = ?"
+            params.append(dim)
+        sql += " ORDER BY bucket, dim"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        results = []
+        for bucket, dim_value, count, *sums in rows:
+            item = {"bucket_start": iso(bucket), dim_column: dim_value, "count": count}
+            for i, metric in enumerate(metrics):
+                total, observed = sums[2 * i], sums[2 * i + 1]
+                item[f"{metric}_sum"] = total
+                item[f"{metric}_avg"] = round(total / observed, 4) if observed else None
+            results.append(item)
+        return results
+
+
+rollup_engine = RollupEngine()
+router = APIRouter(prefix="/api/rollups")
+
+
+def fold_rows(table: str, rows: List[Dict[str, Any]]) -> None:
+    """Analytics cache listener: fold rows the analytics refresh already pulled.
+
+    Every worker refreshes its analytics cache, but only the collecting worker
+    writes the shared rollups; a handover gap is covered by the next rescan.
+    """
+    if rollup_engine.follows_analytics and scheduler.running:
+        rollup_engine.fold(table, rows)
+
+
+def refresh_after_cycle(run: Dict[str, Any], supabase) -> None:
+    """Scheduler cycle hook: re-read the trailing window, or pull rows by the change
+    column when it is not the analytics time column."""
+    if rollup_engine.follows_analytics:
+        rollup_engine.rescan(supabase)
+    else:
+        rollup_engine.refresh(supabase)
+
+
+@router.get("/{table}")
+def get_rollups(
+    request: Request,
+    table: str,
+    grain: str = "day",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    dim: Optional[str] = None
+):
+    """Hourly or daily aggregates for mentions, posts or seo_signals."""
+    if table not in TABLE_COLUMNS:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    if grain not in GRAINS:
+        raise HTTPException(status_code=400, detail=f"grain must be one of {sorted(GRAINS)}")
+    start = parse_timestamp(since) if since else None
+    end = parse_timestamp(until) if until else None
+    if (since and start is None) or (until and end is None):
+        raise HTTPException(status_code=400, detail="since/until must be ISO timestamps")
+
+    return cached_json(
+        request, ("rollups", table, grain, since, until, dim), rollup_engine.version,
+        lambda: {
+            "table": table,
+            "grain": grain,
+            "buckets": rollup_engine.query(table, grain, start, end, dim)
+        }
+    )
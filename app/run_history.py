@@ -0,0 +1,203 @@
+"""
+MORVO Phase 4 - Run History Store
+Bounded in-memory history of collection cycles with optional JSONL/SQLite persistence
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+HISTORY_SIZE = int(os.environ.get('RUN_HISTORY_SIZE', 500))
+# Persisted by default so every worker can serve the collector's history
+HISTORY_BACKEND = os.environ.get('RUN_HISTORY_BACKEND', 'sqlite')  # memory | jsonl | sqlite
+HISTORY_PATH = os.environ.get('RUN_HISTORY_PATH', '')
+MAX_PAGE_SIZE = 200
+
+
+def parse_since(value):
+    """Parse an ISO timestamp as naive local time, matching the recorded start times"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def compact_run_record(run):
+    """Reduce a full collection result to a compact history record"""
+    sources = {}
+    errors = 0
+    for source, result in run.get('results', {}).items():
+        status = result.get('status')
+        entry = {'status': status}
+        if 'code' in result:
+            entry['code'] = result['code']
+        if 'summary' in result:
+            entry['records'] = result['summary']['records']
+            entry['bytes'] = result['summary']['bytes']
+        if status == 'error':
+            errors += 1
+            entry['message'] = str(result.get('message', ''))[:200]
+        sources[source] = entry
+
+    return {
+        'run_number': run['run_number'],
+        'start_time': run['start_time'],
+        'end_time': run['end_time'],
+        'duration_seconds': run['duration_seconds'],
+        'error_count': errors,
+        'sources': sources
+    }
+
+
+class JsonlBackend:
+    """Append-only JSONL persistence for run records"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, limit):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"⚠️  Skipping corrupt run history line in {self.path}")
+        return records[-limit:]
+
+    def append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+class SqliteBackend:
+    """SQLite persistence for run records"""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS run_history ('
+                'run_number INTEGER PRIMARY KEY, start_time TEXT NOT NULL, record TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_run_history_start ON run_history (start_time)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def load(self, limit):
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT record FROM run_history ORDER BY run_number DESC LIMIT ?', (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def append(self, record):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO run_history (run_number, start_time, record) VALUES (?, ?, ?)',
+                (record['run_number'], record['start_time'], json.dumps(record, separators=(',', ':')))
+            )
+
+
+def create_backend(kind, path):
+    """Build the configured persistence backend, or None for memory only"""
+    if kind == 'jsonl':
+        return JsonlBackend(path or 'run_history.jsonl')
+    if kind == 'sqlite':
+        return SqliteBackend(path or 'run_history.db')
+    return None
+
+
+class RunHistory:
+    """Ring buffer of compact run records.
+
+    Writers replace an immutable tuple snapshot under a lock; readers only take
+    a reference to the current snapshot, so they never wait on the collector.
+    """
+
+    def __init__(self, size=HISTORY_SIZE, backend=None):
+        self.size = size
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._records = ()
+
+        if backend:
+            try:
+                self._records = tuple(backend.load(size))
+                logger.info(f"✅ Loaded {len(self._records)} runs from history")
+            except Exception as e:
+                logger.error(f"❌ Failed to load run history: {e}")
+
+    def append(self, record):
+        """Add a record, dropping the oldest once the buffer is full"""
+        with self._lock:
+            self._records = (self._records + (record,))[-self.size:]
+
+        if self.backend:
+            try:
+                self.backend.append(record)
+            except Exception as e:
+                logger.error(f"❌ Failed to persist run history: {e}")
+
+    def sync(self, run_count):
+        """Reload from the backend when another worker has recorded newer runs"""
+        if not self.backend or run_count <= self.last_run_number():
+            return
+        try:
+            records = tuple(self.backend.load(self.size))
+        except Exception as e:
+            logger.error(f"❌ Failed to reload run history: {e}")
+            return
+        with self._lock:
+            if records and records[-1]['run_number'] > self.last_run_number():
+                self._records = records
+
+    def last_run_number(self):
+        """Run number of the newest record, so numbering survives restarts"""
+        records = self._records
+        return records[-1]['run_number'] if records else 0
+
+    def snapshot(self):
+        """Return the current immutable tuple of records (oldest first)"""
+        return self._records
+
+    def query(self, since=None, limit=20, source=None, cursor=None):
+        """Return a page of records, newest first.
+
+        `since` is an ISO timestamp (offsets are converted to local time), `source` keeps runs that include that source,
+        and `cursor` is the `next_cursor` of a previous page.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        since_dt = parse_since(since) if since else None
+
+        page = []
+        next_cursor = None
+        for record in reversed(self.snapshot()):
+            if cursor is not None and record['run_number'] >= cursor:
+                continue
+            if since_dt and datetime.fromisoformat(record['start_time']) < since_dt:
+                break
+            if source and source not in record['sources']:
+                continue
+            if len(page) == limit:
+                next_cursor = page[-1]['run_number']
+                break
+            if source:
+                record = dict(record, sources={source: record['sources'][source]})
+            page.append(record)
+
+        return {'runs': page, 'next_cursor': next_cursor}
+
+
+run_history = RunHistory(backend=create_backend(HISTORY_BACKEND, HISTORY_PATH))
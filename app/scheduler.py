@@ -0,0 +1,547 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Request
+from supabase import create_client
+
+from app import ingestion
+from app.fastjson import dumps, loads
+from app.payload_summary import summarize_response_async, summarize_events, iter_events
+from app.responses import cached_json
+from app.run_history import run_history, compact_run_record, parse_since
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; every process then runs its own collector
+    fcntl = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
+SCHEDULE_INTERVAL = int(os.getenv("SCHEDULE_INTERVAL_HOURS", 6))
+EDGE_PAYLOAD_MODE = os.getenv("EDGE_PAYLOAD_MODE", "summary")  # summary | full
+INITIAL_RUN_DELAY = 30
+# Only one process per host collects; set SCHEDULER_ENABLED=false on hosts that should only serve
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() not in ("0", "false", "no")
+SCHEDULER_LOCK_PATH = os.getenv("SCHEDULER_LOCK_PATH", "morvo_scheduler.lock")
+# Schedule, results and start/stop requests shared by the workers on this host
+SCHEDULER_STATE_PATH = os.getenv("SCHEDULER_STATE_PATH", "morvo_scheduler.db")
+SCHEDULER_SYNC_SECONDS = float(os.getenv("SCHEDULER_SYNC_SECONDS", 15))
+
+EDGE_FUNCTIONS = {
+    "seo": f"{SUPABASE_URL}/functions/v1/fetchSeoSignals",
+    "mentions": f"{SUPABASE_URL}/functions/v1/fetchMentions",
+    "posts": f"{SUPABASE_URL}/functions/v1/fetchPosts"
+}
+
+VERIFY_TABLES = ("seo_signals", "mentions", "posts")
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+class RunnerLock:
+    """Non-blocking exclusive file lock electing the one worker that runs the collector."""
+
+    def __init__(self, path: str = SCHEDULER_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a")
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()  # closing drops the flock
+            self._file = None
+
+
+class SchedulerState:
+    """Scheduler state in a SQLite file shared by every worker on the host.
+
+    The elected runner publishes its schedule and results here and every worker
+    serves /api/status and /api/results from it. Start/stop requests made on
+    any worker set `enabled`, which the runner follows on its next sync.
+    `version` changes with every write and keys the cached responses.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scheduler_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL, enabled INTEGER NOT NULL, running INTEGER NOT NULL,
+        runner_pid INTEGER, next_run TEXT, last_run TEXT,
+        run_count INTEGER NOT NULL, last_results TEXT NOT NULL
+    );
+    """
+    COLUMNS = ("version", "enabled", "running", "runner_pid", "next_run", "last_run", "run_count", "last_results")
+
+    def __init__(self, path: str = SCHEDULER_STATE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO scheduler_state VALUES (1, 0, 1, 0, NULL, NULL, NULL, ?, '{}')",
+                (run_history.last_run_number(),)
+            )
+
+    def version(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT version FROM scheduler_state WHERE id = 1").fetchone()[0]
+
+    def read(self) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM scheduler_state WHERE id = 1").fetchone()
+        state = dict(zip(self.COLUMNS, row))
+        state["last_results"] = loads(state["last_results"])
+        return state
+
+    def update(self, **fields: Any) -> None:
+        """Write the given fields and bump the version."""
+        if "last_results" in fields:
+            fields["last_results"] = dumps(fields["last_results"]).decode("utf-8")
+        assignments = "".join(f", {name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE scheduler_state SET version = version + 1{assignments} WHERE id = 1",
+                tuple(fields.values())
+            )
+
+    def next_run_number(self) -> int:
+        """Allocate the next run number, so runs from any worker never share one."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE scheduler_state SET run_count = MAX(run_count, ?) + 1 WHERE id = 1",
+                               (run_history.last_run_number(),))
+            return self._conn.execute("SELECT run_count FROM scheduler_state WHERE id = 1").fetchone()[0]
+
+
+class AsyncScheduler:
+    """MORVO Phase 4 collector running as asyncio tasks on the FastAPI event loop.
+
+    Every worker keeps a sync task following the shared SchedulerState; only
+    the worker holding the runner lock collects. If that worker exits, another
+    one takes over on its next sync.
+    """
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.supabase = None
+        self.running = False  # True only in the worker that is collecting
+        self.state = SchedulerState()
+        self._task: Optional[asyncio.Task] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._cycle_lock = asyncio.Lock()
+        self._cycle_hooks: List[Callable[[Dict[str, Any], Any], Any]] = []
+        self._refresh_hooks: List[Callable[[Any], Any]] = []
+        self._refresh_lock = asyncio.Lock()
+        self._refreshed_run: Optional[int] = None
+        self._refreshed_at = 0.0
+        self.runner_lock = RunnerLock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(SUPABASE_URL and SUPABASE_ANON_KEY)
+
+    @property
+    def state_version(self) -> int:
+        return self.state.version()
+
+    def add_cycle_hook(self, hook: Callable[[Dict[str, Any], Any], Any]) -> None:
+        """Register a blocking `hook(run, supabase)` to run after every collection cycle."""
+        self._cycle_hooks.append(hook)
+
+    def add_refresh_hook(self, hook: Callable[[Any], Any]) -> None:
+        """Register a blocking callable(supabase) that refreshes this worker's caches.
+
+        Unlike cycle hooks these run in every worker: on startup, after each
+        collection recorded in the shared state, and at least once per interval.
+        """
+        self._refresh_hooks.append(hook)
+
+    async def refresh_worker(self, run_count: int) -> None:
+        """Run the refresh hooks in this worker for the given shared run count."""
+        if not self.supabase:
+            return
+        async with self._refresh_lock:
+            for hook in self._refresh_hooks:
+                try:
+                    await asyncio.to_thread(hook, self.supabase)
+                except Exception as e:
+                    logger.error(f"❌ Worker refresh hook {getattr(hook, '__name__', hook)} failed: {e}")
+            self._refreshed_run = run_count
+            self._refreshed_at = time.monotonic()
+
+    def _refresh_due(self, run_count: int) -> bool:
+        return (run_count != self._refreshed_run
+                or time.monotonic() - self._refreshed_at >= SCHEDULE_INTERVAL * 3600)
+
+    async def _run_cycle_hooks(self, run: Dict[str, Any]) -> None:
+        for hook in self._cycle_hooks:
+            try:
+                await asyncio.to_thread(hook, run, self.supabase)
+            except Exception as e:
+                logger.error(f"❌ Post-collection hook {getattr(hook, '__name__', hook)} failed: {e}")
+
+    async def open(self) -> None:
+        """Create the shared HTTP client and Supabase client."""
+        self.client = httpx.AsyncClient(
+            timeout=60.0,
+            headers={
+                "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+                "Content-Type": "application/json"
+            }
+        )
+        if self.configured:
+            try:
+                self.supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+                logger.info("✅ Supabase client initialized")
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize Supabase client: {e}")
+
+    async def close(self) -> None:
+        """Stop the scheduler and release the HTTP client."""
+        if self._sync_task:
+            self._sync_task.cancel()
+            self._sync_task = None
+        self.stop()
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    async def call_edge_function(self, function_name: str, url: str) -> Dict[str, Any]:
+        """Call a Supabase Edge Function."""
+        try:
+            logger.info(f"🔄 Calling {function_name} Edge Function...")
+            async with self.client.stream("POST", url, json=ingestion.edge_request_body(function_name)) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    logger.error(f"❌ {function_name} failed: HTTP {response.status_code}")
+                    return {
+                        "status": "error",
+                        "code": response.status_code,
+                        "message": body[:200].decode("utf-8", "replace"),
+                        "timestamp": _now()
+                    }
+
+                logger.info(f"✅ {function_name} completed successfully")
+                batch = ingestion.start_batch(function_name, self.supabase, autoflush=False)
+
+                if EDGE_PAYLOAD_MODE == "summary":
+                    summary = await summarize_response_async(function_name, response, batch=batch)
+                    result = {"status": "success", "summary": summary, "timestamp": _now()}
+                else:
+                    await response.aread()
+                    data = response.json()
+                    if batch:
+                        summarize_events(iter_events(data), batch.add)
+                    result = {"status": "success", "data": data, "timestamp": _now()}
+
+            if batch:
+                await asyncio.to_thread(batch.flush)
+                result["ingest"] = batch.stats()
+                logger.info(f"📥 {function_name} ingestion: {result['ingest']}")
+            return result
+
+        except ValueError as e:
+            logger.error(f"❌ {function_name} returned invalid JSON: {str(e)}")
+            return {"status": "error", "message": f"Invalid JSON: {str(e)[:200]}", "timestamp": _now()}
+        except httpx.HTTPError as e:
+            logger.error(f"❌ {function_name} network error: {str(e)}")
+            return {"status": "error", "message": f"Network error: {str(e)}", "timestamp": _now()}
+
+    def _verify_data_in_tables(self) -> Dict[str, Any]:
+        if not self.supabase:
+            return {"status": "error", "message": "Supabase client not initialized"}
+        try:
+            results = {}
+            for table in VERIFY_TABLES:
+                data = self.supabase.table(table).select("*").limit(1).execute()
+                results[table] = {
+                    "count": len(data.data),
+                    "latest": data.data[0] if data.data else None
+                }
+            logger.info("✅ Database verification completed")
+            return {"status": "success", "tables": results}
+        except Exception as e:
+            logger.error(f"❌ Database verification failed: {e}")
+            return {"status": "error", "message": str(e)}
+
+    async def verify_data_in_tables(self) -> Dict[str, Any]:
+        """Verify that data was stored in Supabase tables (sync client, run off-loop)."""
+        return await asyncio.to_thread(self._verify_data_in_tables)
+
+    async def fetch_all_morvo_data(self) -> Dict[str, Any]:
+        """Execute a complete MORVO data collection cycle."""
+        async with self._cycle_lock:
+            start_time = datetime.now()
+            logger.info(f"🚀 Starting MORVO Phase 4 data collection at {start_time.isoformat()}")
+
+            results: Dict[str, Any] = {}
+            for source, url in EDGE_FUNCTIONS.items():
+                if url and url.startswith("http"):
+                    results[source] = await self.call_edge_function(source, url)
+                    await asyncio.sleep(2)  # Brief pause between calls
+                else:
+                    results[source] = {"status": "skipped", "message": "URL not configured", "timestamp": _now()}
+
+            results["database_verification"] = await self.verify_data_in_tables()
+            run_number = self.state.next_run_number()
+
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds()
+            logger.info(f"🎉 MORVO Phase 4 collection completed in {duration:.2f} seconds")
+
+            run = {
+                "phase": 4,
+                "start_time": start_time.isoformat(),
+                "end_time": end_time.isoformat(),
+                "duration_seconds": duration,
+                "run_number": run_number,
+                "results": results
+            }
+            run_history.append(compact_run_record(run))
+            self.state.update(last_run=start_time.isoformat(), last_results=results)
+            await self._run_cycle_hooks(run)
+            await self.refresh_worker(run_number)
+            return run
+
+    async def _worker(self, initial_delay: float) -> None:
+        logger.info(f"📅 MORVO Phase 4 scheduler started - interval: {SCHEDULE_INTERVAL} hours")
+        await asyncio.sleep(initial_delay)
+        while self.running:
+            next_run = datetime.now() + timedelta(hours=SCHEDULE_INTERVAL)
+            self.state.update(next_run=next_run.isoformat())
+            try:
+                await self.fetch_all_morvo_data()
+            except Exception as e:
+                logger.error(f"❌ Scheduler execution error: {str(e)}")
+            logger.info(f"⏰ Next MORVO collection scheduled for {next_run.isoformat()}")
+            await asyncio.sleep(max((next_run - datetime.now()).total_seconds(), 0))
+
+    def start(self, initial_delay: float = 0, enable: bool = False) -> bool:
+        """Start the scheduler task if this process holds the runner lock.
+
+        `enable` also clears an earlier stop request; without it a worker only
+        takes over while the shared state is enabled.
+        """
+        if self.running or not self.runner_lock.acquire():
+            return False
+        if not enable and not self.state.read()["enabled"]:
+            self.runner_lock.release()
+            return False
+        self.running = True
+        self.state.update(running=1, runner_pid=os.getpid(), enabled=1)
+        self._task = asyncio.create_task(self._worker(initial_delay))
+        logger.info(f"✅ MORVO Phase 4 scheduler activated in worker {os.getpid()}")
+        return True
+
+    def stop(self) -> None:
+        """Stop collecting in this worker (other workers may take over while enabled)."""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.state.update(running=0, runner_pid=None, next_run=None)
+        self.runner_lock.release()
+
+    def request_start(self) -> bool:
+        """Enable collection for the host and start it here unless another worker already runs it."""
+        self.state.update(enabled=1)
+        return self.start(enable=True)
+
+    def request_stop(self) -> None:
+        """Disable collection for the host; the collecting worker stops on its next sync."""
+        self.state.update(enabled=0)
+        self.stop()
+
+    def _takeover_delay(self, state: Dict[str, Any]) -> float:
+        """Wait until the previous runner's next scheduled run, if it is still ahead."""
+        if not state["next_run"]:
+            return INITIAL_RUN_DELAY
+        return max((datetime.fromisoformat(state["next_run"]) - datetime.now()).total_seconds(), 0)
+
+    async def _sync(self) -> None:
+        """Follow the shared state: stop on request, take over when no worker is
+        collecting, and refresh this worker's caches after new collections."""
+        while True:
+            try:
+                state = await asyncio.to_thread(self.state.read)
+                if self.running and not state["enabled"]:
+                    logger.info("🛑 MORVO Phase 4 scheduler stopped by request from another worker")
+                    self.stop()
+                elif not self.running and state["enabled"] and SCHEDULER_ENABLED:
+                    if self.start(initial_delay=self._takeover_delay(state)):
+                        logger.info("🔁 MORVO Phase 4 scheduler taken over by this worker")
+                if self._refresh_due(state["run_count"]):
+                    await self.refresh_worker(state["run_count"])
+            except Exception as e:
+                logger.error(f"❌ Scheduler sync failed: {e}")
+            await asyncio.sleep(SCHEDULER_SYNC_SECONDS)
+
+    def start_sync(self) -> None:
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync())
+
+    def status(self) -> Dict[str, Any]:
+        state = self.state.read()
+        return {
+            "morvo_phase_4": {
+                "status": "completed" if state["running"] else "ready",
+                "scheduler_active": bool(state["running"]),
+                "scheduler_enabled": bool(state["enabled"]) and SCHEDULER_ENABLED,
+                "runner_pid": state["runner_pid"],
+                "pid": os.getpid(),
+                "interval_hours": SCHEDULE_INTERVAL,
+                "next_run": state["next_run"],
+                "last_run": state["last_run"],
+                "total_runs": state["run_count"]
+            },
+            "edge_functions": {
+                "seo_signals": EDGE_FUNCTIONS["seo"],
+                "brand_mentions": EDGE_FUNCTIONS["mentions"],
+                "social_posts": EDGE_FUNCTIONS["posts"]
+            },
+            "configuration": {
+                "supabase_url_set": bool(SUPABASE_URL),
+                "supabase_key_set": bool(SUPABASE_ANON_KEY),
+                "supabase_client_ready": bool(self.supabase)
+            },
+            "project_phases": {
+                "phase_1": "Data Schema ✅",
+                "phase_2": "Supabase Setup ✅",
+                "phase_3": "Edge Functions ✅",
+                "phase_4": "Scheduler ✅",
+                "phase_5": "Backend Logic ✅ (/api/analytics)",
+                "phase_6": "Frontend Dashboard (Next - Rafa)"
+            }
+        }
+
+
+scheduler = AsyncScheduler()
+router = APIRouter()
+
+
+async def startup() -> None:
+    """Open clients and start collecting when Supabase is configured."""
+    await scheduler.open()
+    if not scheduler.configured:
+        logger.warning("⚠️  Phase 4 requires SUPABASE_URL and SUPABASE_ANON_KEY environment variables")
+        return
+    if not SCHEDULER_ENABLED:
+        logger.info("⏸️  Phase 4 scheduler disabled on this host (SCHEDULER_ENABLED)")
+    elif not scheduler.start(initial_delay=INITIAL_RUN_DELAY, enable=True):
+        logger.info(f"⏸️  Phase 4 scheduler already running in another worker ({SCHEDULER_LOCK_PATH} is locked)")
+    scheduler.start_sync()
+
+
+async def shutdown() -> None:
+    await scheduler.close()
+
+
+@router.get("/health")
+def health():
+    return {
+        "status": "healthy",
+        "phase4_active": bool(scheduler.state.read()["running"]),
+        "supabase_connected": bool(scheduler.supabase),
+        "timestamp": _now()
+    }
+
+
+@router.get("/api/status")
+def detailed_status(request: Request):
+    return cached_json(request, "scheduler_status", scheduler.state_version, scheduler.status)
+
+
+@router.get("/api/results")
+def get_last_results(
+    request: Request,
+    since: Optional[str] = None,
+    limit: int = 20,
+    source: Optional[str] = None,
+    cursor: Optional[int] = None
+):
+    """Get results from the last data collection run plus a page of run history."""
+    if since:
+        try:
+            parse_since(since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid since: {e}")
+
+    def build():
+        state = scheduler.state.read()
+        results = state["last_results"]
+        if source:
+            results = {source: results[source]} if source in results else {}
+        run_history.sync(state["run_count"])
+        return {
+            "last_run": state["last_run"],
+            "run_count": state["run_count"],
+            "results": results,
+            "history": run_history.query(since=since, limit=limit, source=source, cursor=cursor)
+        }
+
+    return cached_json(request, ("scheduler_results", since, limit, source, cursor), scheduler.state_version, build)
+
+
+@router.post("/api/trigger")
+async def manual_trigger():
+    """Manually trigger Phase 4 data collection."""
+    logger.info("🔧 Manual Phase 4 trigger requested")
+    try:
+        result = await scheduler.fetch_all_morvo_data()
+        return {"message": "MORVO Phase 4 manual collection completed", "result": result}
+    except Exception as e:
+        logger.error(f"❌ Manual trigger failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/scheduler/start")
+async def start_scheduler():
+    """Start the Phase 4 scheduler."""
+    if scheduler.request_start():
+        return {"message": "MORVO Phase 4 scheduler started successfully"}
+    if not scheduler.running:
+        return {"message": "MORVO Phase 4 scheduler already running in another worker"}
+    return {"message": "MORVO Phase 4 scheduler already running"}
+
+
+@router.post("/api/scheduler/stop")
+async def stop_scheduler():
+    """Stop the Phase 4 scheduler on whichever worker is collecting."""
+    was_running = scheduler.running
+    scheduler.request_stop()
+    logger.info("🛑 MORVO Phase 4 scheduler stop requested")
+    if was_running:
+        return {"message": "MORVO Phase 4 scheduler stopped"}
+    return {"message": f"MORVO Phase 4 scheduler stop requested; the collecting worker stops within {SCHEDULER_SYNC_SECONDS:g}s"}
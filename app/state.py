@@ -1,5 +1,19 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
+from typing_extensions import TypedDict
+
+class ConversationState(TypedDict, total=False):
+    user_id: str
+    input: str
+    name: str
+    role: str
+    goal: str
+    language: str
+    history: str  # latest assistant reply
+    messages: List[dict]
+    next: str
+    deadline: float  # time.monotonic() value the turn must finish by
+    error: str  # set when the reply is an apology for a failed upstream call
 
 class ChatRequest(BaseModel):
     message: str
@@ -7,4 +21,9 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     response: str
-    history: List[str]
\ No newline at end of file
+    history: List[str]
+
+class BatchChatRequest(BaseModel):
+    items: List[ChatRequest]
+    max_concurrency: Optional[int] = None
+    item_timeout: Optional[float] = None
\ No newline at end of file
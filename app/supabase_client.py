@@ -5,22 +5,29 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
+# Collector deployments only set SUPABASE_ANON_KEY, so fall back to it
 url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
+key = os.getenv("SUPABASE_KEY") or os.getenv("SUPABASE_ANON_KEY")
 
-if not url or not key:
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+# Created on first use so the app can start without Supabase credentials
+_supabase = None
 
-supabase = create_client(url, key)
+def get_supabase():
+    """Return the shared Supabase client, creating it on first use."""
+    global _supabase
+    if _supabase is None:
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY (or SUPABASE_ANON_KEY) must be set in .env file")
+        _supabase = create_client(url, key)
+    return _supabase
 
 def test_supabase_connection():
     """Test function to verify Supabase connection"""
     try:
         # Try to select from mentions table
-        response = supabase.table("mentions").select("*").limit(1).execute()
+        response = get_supabase().table("mentions").select("*").limit(1).execute()
         print("Select test successful:", response)
         return {"success": True, "data": response.data}
     except Exception as e:
         print("Supabase error:", str(e))
-        return {"success": False, "error": str(e)}
\ No newline at end of file
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+MORVO - Chat turn bookkeeping benchmark
+Times the per-turn work around the model call (message and profile records,
+session store writes, response encoding) against the previous pydantic path,
+on the in-memory store and on SqliteMemory (the default backend) in a temp
+directory, and reports the allocation high-water mark per turn (tracemalloc).
+
+Run from the repository root: python benchmarks/chat_turn.py
+"""
+import json
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+import warnings
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MEMORY_BACKEND", "memory")  # don't create the session database in the cwd
+warnings.filterwarnings("ignore", category=DeprecationWarning)  # the baseline keeps pydantic v1 calls
+
+from app.fastjson import dumps, orjson  # noqa: E402
+from app.memory import SqliteMemory, TemporaryMemory, utc_now_iso  # noqa: E402
+
+TURNS = {"memory": 20000, "sqlite": 2000}
+ALLOC_TURNS = 200
+REPLY = "Focus your budget on the two channels with the highest ROAS this quarter. " * 4
+
+
+class ChatMessage(BaseModel):
+    """Message model the chat node used to build before converting to a dict."""
+    role: str = Field(enum=["user", "assistant", "system"])
+    content: str
+    timestamp: Optional[datetime] = None
+
+
+class UserProfile(BaseModel):
+    name: str
+    role: str
+    goal: str
+    language: str = Field(default="en")
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+def pydantic_turn(memory, user_id: str) -> bytes:
+    if not memory.get_user_profile(user_id):
+        memory.save_user_profile(user_id, UserProfile(name="Sam", role="CMO", goal="ROI").dict())
+    user_msg = ChatMessage(role="user", content="How should I split my budget?", timestamp=datetime.utcnow())
+    assistant_msg = ChatMessage(role="assistant", content=REPLY, timestamp=datetime.utcnow())
+    memory.save_conversation(user_id, user_msg.dict())
+    memory.save_conversation(user_id, assistant_msg.dict())
+    history: List[str] = [m["content"] for m in memory.get_conversation_history(user_id)]
+    return json.dumps({"response": REPLY, "history": history}).encode("utf-8")
+
+
+def dict_turn(memory, user_id: str) -> bytes:
+    if not memory.get_user_profile(user_id):
+        memory.save_user_profile(user_id, {"name": "Sam", "role": "CMO", "goal": "ROI", "language": "en"})
+    now = utc_now_iso()
+    memory.save_conversation(user_id, {"role": "user", "content": "How should I split my budget?", "timestamp": now})
+    memory.save_conversation(user_id, {"role": "assistant", "content": REPLY, "timestamp": now})
+    history = [m["content"] for m in memory.get_conversation_history(user_id)]
+    return dumps({"response": REPLY, "history": history})
+
+
+def peak_bytes(turn, memory) -> float:
+    """Mean tracemalloc peak above the live heap during one turn."""
+    turn(memory, "alloc-user")  # warm up caches and the profile
+    total = 0
+    tracemalloc.start()
+    for _ in range(ALLOC_TURNS):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        turn(memory, "alloc-user")
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / ALLOC_TURNS
+
+
+def bench(turn, backend: str, workdir: str):
+    """Return (µs per turn, peak bytes per turn) on a fresh store."""
+    if backend == "sqlite":
+        memory = SqliteMemory(os.path.join(workdir, f"{turn.__name__}.db"))
+    else:
+        memory = TemporaryMemory()
+    seconds = timeit.timeit(lambda: turn(memory, "bench-user"), number=TURNS[backend])
+    return seconds / TURNS[backend] * 1e6, peak_bytes(turn, memory)
+
+
+if __name__ == "__main__":
+    print(f"encoder: {'orjson' if orjson is not None else 'stdlib json'}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in TURNS:
+            baseline, baseline_peak = bench(pydantic_turn, backend, workdir)
+            current, current_peak = bench(dict_turn, backend, workdir)
+            print(f"{backend} store, {TURNS[backend]} turns")
+            print(f"  pydantic models + json: {baseline:.1f} µs/turn, peak {baseline_peak / 1024:.1f} KiB/turn")
+            print(f"  dict records + fastjson: {current:.1f} µs/turn ({baseline / current:.1f}x), "
+                  f"peak {current_peak / 1024:.1f} KiB/turn")
@@ -14,5 +14,8 @@ setup(
         "typing-extensions",
         "httpx",
         "supabase",
+        "numpy",
+        "ijson",
+        "orjson",
     ],
 )
\ No newline at end of file